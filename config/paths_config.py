@@ -1,6 +1,13 @@
 import os
 
 RAW_DIR = "artifacts/raw"
-TRAIN_PATH = os.path.join(RAW_DIR, "titanic_train.csv")
-TEST_PATH = os.path.join(RAW_DIR, "titanic_test.csv")
-PROCESSED_DIR = "artifacts/processed"
\ No newline at end of file
+RAW_DATA_PATH = os.path.join(RAW_DIR, "titanic.parquet")
+TRAIN_PATH = os.path.join(RAW_DIR, "titanic_train.parquet")
+TEST_PATH = os.path.join(RAW_DIR, "titanic_test.parquet")
+PROCESSED_DIR = "artifacts/processed"
+
+# thin per-step images for the Kubeflow components, built from docker/<step>/Dockerfile
+INGEST_IMAGE = os.getenv("INGEST_IMAGE", "vdhinh/titanic-ingest:latest")    # duckdb (+ postgres extension) + pandas + numpy + pyarrow
+PROCESS_IMAGE = os.getenv("PROCESS_IMAGE", "vdhinh/titanic-process:latest") # pandas + pyarrow + imblearn + redis
+TRAIN_IMAGE = os.getenv("TRAIN_IMAGE", "vdhinh/titanic-train:latest")       # sklearn + mlflow + redis + joblib/lz4
+KUBEFLOW_URL = os.getenv("KUBEFLOW_URL", "localhost:8080")
\ No newline at end of file
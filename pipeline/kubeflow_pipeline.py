@@ -1,58 +1,131 @@
+import os
+import json
+from datetime import datetime
+
 import kfp
 from kfp import dsl
-from kfp.components import create_component_from_func
+from kfp.components import create_component_from_func, InputPath, OutputPath
 from kfp.compiler import Compiler
 
-from src.data_ingestion import DataIngestion
-from src.data_processing import DataProcessing
-from src.model_training import ModelTraining
-from src.feature_store import RedisFeatureStore
-from config.paths_config import RAW_DIR, TRAIN_PATH, TEST_PATH, BASE_IMAGE, KUBEFLOW_URL
-from config.database_config import DB_CONFIG
+from config.paths_config import INGEST_IMAGE, PROCESS_IMAGE, TRAIN_IMAGE, KUBEFLOW_URL
+
+PIPELINE_NAME = "titanic"
+PIPELINE_PACKAGE_PATH = "titanic_pipeline.yaml"
+EXPERIMENT_NAME = "titanic"
+
+# cached steps are reused for identical inputs within this window; processing (Redis side effect) and training always rerun
+CACHE_STALENESS = "P30D"
+NO_CACHE = "P0D"
+
+# Components run in their own pods from their function source only, so imports live inside
+# each function and data moves between steps as Kubeflow artifacts, not local paths.
+
+# Component 1a: Data Extraction
+def data_extraction_op(source_table: str, source_version: str, raw_data_path: OutputPath("Parquet")):
+    """Extract the source table from the DB and store it as raw Parquet.
+
+    source_version is only part of the cache key and must change whenever the table does.
+    """
+    from src.data_ingestion import DataIngestion
+    from config.paths_config import RAW_DIR
+    from config.database_config import DB_CONFIG
 
-# Component 1: Data Ingestion
-def data_ingestion_op():
-    """Ingest data from the source DB and store raw data."""
     data_ingestion = DataIngestion(DB_CONFIG, RAW_DIR)
-    data_ingestion.run()
+    data_ingestion.export_raw_data(source_table, output_path=raw_data_path)
+
+# Component 1b: Split and Save
+def split_save_op(raw_data_path: InputPath("Parquet"), split: str, source_version: str, split_data_path: OutputPath("Parquet")):
+    """Split the raw extract and store one side ("train" or "test")."""
+    from src.data_ingestion import DataIngestion
+    from config.paths_config import RAW_DIR
+    from config.database_config import DB_CONFIG
+
+    data_ingestion = DataIngestion(DB_CONFIG, RAW_DIR)
+    data_ingestion.save_split(split, raw_data_path=raw_data_path, output_path=split_data_path)
 
 # Component 2: Data Processing
-def data_processing_op():
+def data_processing_op(train_data_path: InputPath("Parquet"), test_data_path: InputPath("Parquet")):
     """Process raw data and write features to Redis feature store."""
+    from src.data_processing import DataProcessing
+    from src.feature_store import RedisFeatureStore
+
     feature_store = RedisFeatureStore()
-    processor = DataProcessing(TRAIN_PATH, TEST_PATH, feature_store)
+    processor = DataProcessing(train_data_path, test_data_path, feature_store)
     processor.run()
 
 # Component 3: Model Training
 def model_training_op():
     """Train a model using features from Redis and log experiment with MLflow."""
+    from src.model_training import ModelTraining
+    from src.feature_store import RedisFeatureStore
+
     feature_store = RedisFeatureStore()
     trainer = ModelTraining(feature_store)
     trainer.run()
 
 # Wrap Python functions as Kubeflow components
-data_ingestion_component = create_component_from_func(data_ingestion_op, base_image=BASE_IMAGE)
-data_processing_component = create_component_from_func(data_processing_op, base_image=BASE_IMAGE)
-model_training_component = create_component_from_func(model_training_op, base_image=BASE_IMAGE)
+data_extraction_component = create_component_from_func(data_extraction_op, base_image=INGEST_IMAGE)
+split_save_component = create_component_from_func(split_save_op, base_image=INGEST_IMAGE)
+data_processing_component = create_component_from_func(data_processing_op, base_image=PROCESS_IMAGE)
+model_training_component = create_component_from_func(model_training_op, base_image=TRAIN_IMAGE)
 
 @dsl.pipeline(
     name="Titanic Prediction Pipeline",
     description="An ML pipeline for Titanic survival prediction"
 )
-def titanic_pipeline():
-    """Kubeflow pipeline: Ingest -> Process -> Train"""
-    step_ingest = data_ingestion_component()
-    step_process = data_processing_component().after(step_ingest)
-    step_train = model_training_component().after(step_process)
+def titanic_pipeline(source_version: str, source_table: str = "public.titanic"):
+    """Kubeflow pipeline: Extract -> (Save train || Save test) -> Process -> Train"""
+    step_extract = data_extraction_component(source_table=source_table, source_version=source_version).set_cpu_request("1").set_memory_request("2Gi")
+
+    # both sides of the split only depend on the extract artifact, so they run concurrently
+    step_save_train = split_save_component(raw_data=step_extract.output, split="train", source_version=source_version).set_cpu_request("1").set_memory_request("2Gi")
+    step_save_test = split_save_component(raw_data=step_extract.output, split="test", source_version=source_version).set_cpu_request("1").set_memory_request("2Gi")
+
+    step_process = data_processing_component(train_data=step_save_train.output, test_data=step_save_test.output).set_cpu_request("2").set_memory_request("4Gi")
+    # the limit sets the cgroup quota joblib sizes n_jobs=-1 from; a bare request lets it use every node core
+    step_train = model_training_component().after(step_process).set_cpu_request("4").set_cpu_limit("4").set_memory_request("4Gi")
+
+    # unchanged source data reuses the extract/split artifacts on repeat runs; processing still
+    # rewrites Redis so training never reads a store that was reset since the cached run
+    for step in (step_extract, step_save_train, step_save_test):
+        step.execution_options.caching_strategy.max_cache_staleness = CACHE_STALENESS
+    for step in (step_process, step_train):
+        step.execution_options.caching_strategy.max_cache_staleness = NO_CACHE
+
+def get_pipeline_version_id(client, pipeline_id, version_name):
+    """Return the id of an already uploaded pipeline version, or None."""
+    version_filter = json.dumps({"predicates": [{"op": 1, "key": "name", "stringValue": version_name}]})  # op 1 = EQUALS
+    response = client.list_pipeline_versions(pipeline_id=pipeline_id, page_size=1, filter=version_filter)
+    return response.versions[0].id if response.versions else None
 
 if __name__ == "__main__":
-    # Compile the pipeline to a YAML file
-    Compiler().compile(
-        pipeline_func=titanic_pipeline, 
-        package_path="titanic_pipeline.yaml"
-    )
+    # cache key for the source data, e.g. a hash of the table or its last load id; no default on purpose.
+    # Checked before any client call so a missing value can't leave an orphan pipeline version behind.
+    source_version = os.getenv("SOURCE_VERSION")
+    if not source_version:
+        raise SystemExit("SOURCE_VERSION must be set to identify the source data (used as the pipeline cache key)")
 
     # Connect to the Kubeflow Pipelines UI/API
     client = kfp.Client(host=f"http://{KUBEFLOW_URL}/pipeline")
-    # Launch a run of the pipeline
-    client.create_run_from_pipeline_func(titanic_pipeline, arguments={})
+
+    # Reuse the uploaded version if it exists (e.g. CI retry on the same sha), otherwise compile and upload it once
+    version_name = os.getenv("PIPELINE_VERSION", datetime.now().strftime("%Y%m%d%H%M%S"))
+    pipeline_id = client.get_pipeline_id(PIPELINE_NAME)
+    version_id = get_pipeline_version_id(client, pipeline_id, version_name) if pipeline_id else None
+
+    if version_id is None:
+        Compiler().compile(
+            pipeline_func=titanic_pipeline, 
+            package_path=PIPELINE_PACKAGE_PATH
+        )
+
+        if pipeline_id is None:
+            pipeline_id = client.upload_pipeline(PIPELINE_PACKAGE_PATH, pipeline_name=PIPELINE_NAME).id
+
+        version = client.upload_pipeline_version(PIPELINE_PACKAGE_PATH, pipeline_version_name=version_name, pipeline_id=pipeline_id)
+        version_id = version.id
+
+    # Launch a run of the uploaded pipeline version
+    experiment = client.create_experiment(EXPERIMENT_NAME)
+    client.run_pipeline(experiment.id, job_name=f"{PIPELINE_NAME}-{version_name}", version_id=version_id,
+                        params={"source_version": source_version})
@@ -1,15 +1,29 @@
-import psycopg
+import re
+import duckdb
+import numpy as np
 import pandas as pd
 from src.logger import get_logger
 from src.custom_exception import CustomException
 import os
-from sklearn.model_selection import train_test_split
 import sys
 from config.database_config import DB_CONFIG
 from config.paths_config import *
 
 logger = get_logger(__name__)
 
+# [schema.]table made of plain SQL identifiers
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+def make_conninfo(db_params):
+    # libpq keyword/value DSN, values quoted so spaces and quotes survive
+    parts = []
+    for key in ("host", "port", "dbname", "user", "password"):
+        value = str(db_params[key]).replace("\\", "\\\\").replace("'", "\\'")
+        parts.append(f"{key}='{value}'")
+    return " ".join(parts)
+
+
 class DataIngestion:
     def __init__(self, db_params, output_dir):
         self.db_params = db_params
@@ -17,42 +31,62 @@ class DataIngestion:
 
         os.makedirs(self.output_dir, exist_ok=True)
     
-    def connect_to_db(self):
+    # copy the table straight from Postgres to Parquet through DuckDB, no pandas involved
+    def export_raw_data(self, table="public.titanic", output_path=RAW_DATA_PATH):
         try:
-            conn = psycopg.connect(
-                host = self.db_params["host"],
-                port = self.db_params["port"],
-                dbname = self.db_params["dbname"],
-                user = self.db_params["user"],
-                password = self.db_params["password"],
+            if not TABLE_NAME_PATTERN.match(table):
+                raise ValueError(f"Invalid table name {table!r}")
+            quoted_table = ".".join(f'"{part}"' for part in table.split("."))
 
-            )
+            # the postgres extension is installed in INGEST_IMAGE, only load it here
+            with duckdb.connect() as con:
+                con.execute("LOAD postgres")
+                dsn = make_conninfo(self.db_params).replace("'", "''")
+                con.execute(f"ATTACH '{dsn}' AS pg (TYPE POSTGRES, READ_ONLY)")
+                escaped_output_path = output_path.replace("'", "''")
+                con.execute(f"COPY (SELECT * FROM pg.{quoted_table}) TO '{escaped_output_path}' (FORMAT PARQUET, COMPRESSION ZSTD)")
 
-            logger.info("Database connection established ....")
-            return conn
+            logger.info("Raw data exported from DB")
 
         except Exception as e:
-            logger.error(f"error while establishing connection")
+            logger.error(f"error while exporting raw data {e}")
             raise CustomException(str(e), sys)
-        
-    def extract_data(self):
+
+    def split_data(self, df, test_size=0.2, seed=42):
+        # fixed seed so parallel save_split steps and reruns agree on the same split; the extract's
+        # row order is not guaranteed, so sort first or the same seed picks different rows
+        df = df.sort_values("PassengerId", kind="stable", ignore_index=True)
+        rng = np.random.default_rng(seed)
+        idx = rng.permutation(len(df))
+        k = int((1 - test_size) * len(df))
+        return df.iloc[idx[:k]], df.iloc[idx[k:]]
+
+    # save one side of the split from the raw extract (used by parallel pipeline steps).
+    # The split stays in pandas rather than DuckDB so both branches reuse split_data's seeded
+    # permutation; the extract itself never goes through pandas.
+    def save_split(self, split, raw_data_path=RAW_DATA_PATH, output_path=None):
         try:
-            conn = self.connect_to_db()
-            query = "SELECT * FROM public.titanic" # schema.table
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            logger.info("Data extracted from DB")
-            return df
-        
+            df = pd.read_parquet(raw_data_path)
+            train_df, test_df = self.split_data(df)
+
+            if split == "train":
+                train_df.to_parquet(output_path or TRAIN_PATH, engine="pyarrow", compression="zstd", index=False)
+            elif split == "test":
+                test_df.to_parquet(output_path or TEST_PATH, engine="pyarrow", compression="zstd", index=False)
+            else:
+                raise ValueError(f"Unknown split {split}")
+
+            logger.info(f"{split} split saved")
+
         except Exception as e:
-            logger.error(f"error while extracting data {e}")
+            logger.error(f"error while saving {split} split {e}")
             raise CustomException(str(e), sys)
-    
+
     def save_data(self, df):
         try:
-            train_df, test_df = train_test_split(df, test_size=0.2)
-            train_df.to_csv(TRAIN_PATH, index=False)
-            test_df.to_csv(TEST_PATH, index=False)
+            train_df, test_df = self.split_data(df)
+            train_df.to_parquet(TRAIN_PATH, engine="pyarrow", compression="zstd", index=False)
+            test_df.to_parquet(TEST_PATH, engine="pyarrow", compression="zstd", index=False)
 
             logger.info("Data splitting and saving done")
 
@@ -63,7 +97,8 @@ class DataIngestion:
     def run(self):
         try:
             logger.info("Data Ingestion Pipeline started .........")
-            df = self.extract_data()
+            self.export_raw_data()
+            df = pd.read_parquet(RAW_DATA_PATH)
             self.save_data(df)
             logger.info("End of data ingestion pipeline...")
         
@@ -1,7 +1,7 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from imblearn.over_sampling import SMOTE
-from src.feature_store import RedisFeatureStore
+from src.feature_store import RedisFeatureStore, FEATURE_DTYPES
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
@@ -27,8 +27,8 @@ class DataProcessing:
     
     def load_data(self):
         try:
-            self.data = pd.read_csv(self.train_data_path)
-            self.test_data = pd.read_csv(self.test_data_path)
+            self.data = pd.read_parquet(self.train_data_path)
+            self.test_data = pd.read_parquet(self.test_data_path)
 
             logger.info("Read the data sucessfully")
         
@@ -80,26 +80,8 @@ class DataProcessing:
         
     def store_feature_in_redis(self):
         try:
-            batch_data = {}
-
-            for idx, row in self.data.iterrows():
-                entity_id = row["PassengerId"]
-                features = {
-                    "Age" : row['Age'],
-                    "Fare" : row["Fare"],
-                    "Pclass" : row["Pclass"],
-                    "Sex" : row["Sex"],
-                    "Embarked" : row["Embarked"],
-                    "Familysize": row["Familysize"],
-                    "Isalone" : row["Isalone"],
-                    "HasCabin" : row["HasCabin"],
-                    "Title" : row["Title"],
-                    "Pclass_Fare" : row["Pclass_Fare"],
-                    "Age_Fare" : row["Age_Fare"],
-                    "Survived" : row["Survived"]
-                }
-
-                batch_data[entity_id] = features
+            # build {PassengerId: features} in one call instead of iterrows
+            batch_data = self.data.set_index("PassengerId")[list(FEATURE_DTYPES)].to_dict(orient="index")
             
             self.feature_store.store_batch_features(batch_data)
             logger.info("Data has been feeded into Feature Store..")
@@ -1,5 +1,46 @@
 import redis
-import json
+import numpy as np
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# max keys sent to redis in a single command/pipeline
+BATCH_CHUNK_SIZE = 1000
+
+# set of every stored entity id, avoids scanning the keyspace
+ENTITY_IDS_KEY = "entity_ids_set"
+
+# feature schema in storage order, rows are packed little-endian with this layout
+FEATURE_DTYPES = {
+    "Age" : "<f4",
+    "Fare" : "<f4",
+    "Pclass" : "i1",
+    "Sex" : "i1",
+    "Embarked" : "i1",
+    "Familysize" : "i1",
+    "Isalone" : "i1",
+    "HasCabin" : "i1",
+    "Title" : "i1",
+    "Pclass_Fare" : "<f4",
+    "Age_Fare" : "<f4",
+    "Survived" : "i1"
+}
+FEATURE_DTYPE = np.dtype(list(FEATURE_DTYPES.items()))
+
+
+def pack_features(features):
+    return np.array([tuple(features[name] for name in FEATURE_DTYPES)], dtype=FEATURE_DTYPE).tobytes()
+
+
+def unpack_features(blob):
+    row = np.frombuffer(blob, dtype=FEATURE_DTYPE)[0]
+    return {name: row[name].item() for name in FEATURE_DTYPES}
+
+
+def is_packed_features(blob):
+    # rejects legacy JSON values and anything else not written by pack_features
+    return blob is not None and len(blob) == FEATURE_DTYPE.itemsize
+
 
 class RedisFeatureStore:
     def __init__(self, host="localhost", port=6380, db=0):
@@ -9,34 +50,84 @@ class RedisFeatureStore:
             db=db,
             decode_responses=True
         )
+        # features are packed binary, read them without utf-8 decoding
+        self.binary_client = redis.StrictRedis(
+            host=host,
+            port=port,
+            db=db,
+            decode_responses=False
+        )
     
     # store single row
     def store_features(self, entity_id, features):
         key = f"entity:{entity_id}:features"
-        self.client.set(key, json.dumps(features))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, pack_features(features))
+        pipe.sadd(ENTITY_IDS_KEY, entity_id)
+        pipe.execute()
 
     # get single row
     def get_features(self, entity_id):
         key = f"entity:{entity_id}:features"
-        features = self.client.get(key)
+        features = self.binary_client.get(key)
 
-        if features:
-            return json.loads(features)
+        if is_packed_features(features):
+            return unpack_features(features)
         
         return None
     
+    # store many rows, one round trip per chunk
     def store_batch_features(self, batch_data):
-        for entity_id, features in batch_data.items():
-            self.store_features(entity_id, features)
+        items = list(batch_data.items())
+
+        for start in range(0, len(items), BATCH_CHUNK_SIZE):
+            chunk = items[start:start + BATCH_CHUNK_SIZE]
+            pipe = self.client.pipeline(transaction=False)
+            for entity_id, features in chunk:
+                pipe.set(f"entity:{entity_id}:features", pack_features(features))
+            pipe.sadd(ENTITY_IDS_KEY, *[entity_id for entity_id, _ in chunk])
+            pipe.execute()
+
+    # get many raw rows as (entity_id, blob or None), one MGET per chunk so redis fans out server side
+    def get_batch_blobs(self, entity_ids):
+        entity_ids = list(entity_ids)
+
+        for start in range(0, len(entity_ids), BATCH_CHUNK_SIZE):
+            chunk = entity_ids[start:start + BATCH_CHUNK_SIZE]
+            keys = [f"entity:{entity_id}:features" for entity_id in chunk]
+
+            for entity_id, blob in zip(chunk, self.binary_client.mget(keys)):
+                if blob is not None and not is_packed_features(blob):
+                    logger.warning(f"Skipping malformed features for entity {entity_id} ({len(blob)} bytes)")
+                    blob = None
+                yield entity_id, blob
 
     def get_batch_features(self, entity_ids):
-        batch_features = {}
-        for entity_id in entity_ids:
-            batch_features[entity_id] = self.get_features(entity_id)
-        
-        return batch_features
+        return {
+            entity_id: unpack_features(blob) if blob else None
+            for entity_id, blob in self.get_batch_blobs(entity_ids)
+        }
+
+    # get many rows as one structured array (FEATURE_DTYPE), plus the ids that were missing or malformed
+    def get_batch_feature_array(self, entity_ids):
+        blobs = []
+        missing_ids = []
 
+        for entity_id, blob in self.get_batch_blobs(entity_ids):
+            if blob:
+                blobs.append(blob)
+            else:
+                missing_ids.append(entity_id)
+
+        return np.frombuffer(b"".join(blobs), dtype=FEATURE_DTYPE), missing_ids
+
+    # sorted so seeded splits over the ids are reproducible (set/keyspace order is arbitrary)
     def get_all_entity_ids(self):
+        entity_ids = self.client.smembers(ENTITY_IDS_KEY)
+        if entity_ids:
+            return sorted(entity_ids, key=int)
+
+        # fall back for stores written before the id set existed
         keys = self.client.keys('entity:*:features')
         entity_ids = [key.split(":")[1] for key in keys]
-        return entity_ids
+        return sorted(entity_ids, key=int)
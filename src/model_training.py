@@ -1,17 +1,20 @@
 from src.logger import get_logger
 from src.custom_exception import CustomException
-import pandas as pd
-from src.feature_store import RedisFeatureStore
+import numpy as np
+from src.feature_store import RedisFeatureStore, FEATURE_DTYPES
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
 import os
-import pickle
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+import joblib
+from sklearn.metrics import confusion_matrix
 import mlflow
 import mlflow.sklearn
 
 logger = get_logger(__name__)
 
+# model input columns, in matrix order
+FEATURE_ORDER = [name for name in FEATURE_DTYPES if name != "Survived"]
+
 class ModelTraining:
     def __init__(self, feature_store:RedisFeatureStore, model_save_path="artifacts/model/"):
         self.feature_store = feature_store
@@ -25,16 +28,14 @@ class ModelTraining:
         try:
             logger.info("Extracting data from Redis")
 
-            data = []
+            features, missing_ids = self.feature_store.get_batch_feature_array(entity_ids)
+            for entity_id in missing_ids:
+                logger.warning(f"Feature not found for entity {entity_id}")
 
-            for entity_id in entity_ids:
-                features = self.feature_store.get_features(entity_id)
-                if features:
-                    data.append(features)
-                else:
-                    logger.warning("Feature not found")
-            
-            return data
+            # split the packed rows into the feature matrix and target
+            X = np.column_stack([features[name] for name in FEATURE_ORDER]).astype(np.float32, copy=False)
+            y = features["Survived"].astype(np.int8, copy=False)
+            return X, y
         
         except Exception as e:
             logger.error(f"Error while loading data from redis {e}")
@@ -46,17 +47,9 @@ class ModelTraining:
 
             train_entity_ids, test_entity_ids = train_test_split(entity_ids, test_size=0.2, random_state=42)
 
-            train_data = self.load_data_from_redis(train_entity_ids)
-            test_data = self.load_data_from_redis(test_entity_ids)
-
-            train_df = pd.DataFrame(train_data)
-            test_df = pd.DataFrame(test_data)
-
-            X_train = train_df.drop("Survived", axis=1)
-            logger.info(X_train.columns)
-            X_test = test_df.drop("Survived", axis=1)
-            y_train = train_df["Survived"]
-            y_test = test_df["Survived"]
+            X_train, y_train = self.load_data_from_redis(train_entity_ids)
+            X_test, y_test = self.load_data_from_redis(test_entity_ids)
+            logger.info({name: idx for idx, name in enumerate(FEATURE_ORDER)})
 
             logger.info("Preparation for model training completed")
 
@@ -69,18 +62,20 @@ class ModelTraining:
     def hyperparameter_tunning(self, X_train, y_train):
         try:
             param_distributions = {
-                    'n_estimators': [100, 200, 300],
-                    'max_depth': [10, 20, 30],
-                    'min_samples_split': [2, 5],
-                    'min_samples_leaf': [1, 2]
+                    'max_iter': [100, 200, 300],
+                    'max_depth': [None, 6, 10],
+                    'learning_rate': [0.05, 0.1],
+                    'l2_regularization': [0, 1]
                 }
             
-            rf = RandomForestClassifier(random_state=42)
-            random_search = RandomizedSearchCV(rf, param_distributions, n_iter=10, cv=3, scoring='accuracy', random_state=42)
+            # histogram-binned split finding; the inner estimator threads via OpenMP
+            clf = HistGradientBoostingClassifier(random_state=42)
+            random_search = RandomizedSearchCV(clf, param_distributions, n_iter=10, cv=3, scoring='accuracy', refit=True, random_state=42, n_jobs=-1, pre_dispatch="2*n_jobs")
             random_search.fit(X_train, y_train)
 
             logger.info(f"Best paramters : {random_search.best_params_}")
 
+            # already refit on the full training set, no need to fit again
             return random_search.best_estimator_
         
         except Exception as e:
@@ -89,34 +84,37 @@ class ModelTraining:
     
     def train_and_evaluate(self, X_train, y_train, X_test, y_test):
         try:
-            with mlflow.start_run(run_name="RandomForestTraining"):
-                mlflow.log_param("model_type", "RandomForestClassifier")
+            with mlflow.start_run(run_name="HistGradientBoostingTraining"):
+                mlflow.log_param("model_type", "HistGradientBoostingClassifier")
 
                 # Hyperparameters tunning
-                best_rf = self.hyperparameter_tunning(X_train, y_train)
+                best_model = self.hyperparameter_tunning(X_train, y_train)
 
-                # Log best params
-                for param, value in best_rf.get_params().items():
-                    mlflow.log_param(param, value)
+                # Log best params in a single request
+                mlflow.log_params(best_model.get_params())
 
                 # Evaluate
-                y_pred = best_rf.predict(X_test)
-
-                accuracy = accuracy_score(y_test, y_pred)
-                precision = precision_score(y_test, y_pred)
-                recall = recall_score(y_test, y_pred)
-                f1 = f1_score(y_test, y_pred)
-
-                mlflow.log_metric("accuracy", accuracy)
-                mlflow.log_metric("precision", precision)
-                mlflow.log_metric("recall", recall)
-                mlflow.log_metric("f1", f1)
+                y_pred = best_model.predict(X_test)
+
+                # one pass over the labels, derive every metric from the confusion matrix
+                tn, fp, fn, tp = confusion_matrix(y_test, y_pred, labels=[0, 1]).ravel()
+                accuracy = (tp + tn) / len(y_test)
+                precision = tp / (tp + fp) if tp + fp else 0.0
+                recall = tp / (tp + fn) if tp + fn else 0.0
+                f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+                mlflow.log_metrics({
+                    "accuracy": accuracy,
+                    "precision": precision,
+                    "recall": recall,
+                    "f1": f1
+                })
 
                 logger.info(f"Accuracy is {accuracy}")
 
                 # can save into model registry using mlflow, comet ML
-                # self.save_model(best_rf)
-                mlflow.sklearn.log_model(best_rf, "model")
+                # self.save_model(best_model)
+                mlflow.sklearn.log_model(best_model, "model")
 
                 return accuracy
         
@@ -126,10 +124,10 @@ class ModelTraining:
     
     def save_model(self , model):
         try:
-            model_filename = f"{self.model_save_path}random_forest_model.pkl"
+            # joblib + lz4 format, read it back with joblib.load (not pickle.load)
+            model_filename = f"{self.model_save_path}hist_gradient_boosting_model.joblib"
 
-            with open(model_filename,'wb') as model_file:
-                pickle.dump(model , model_file)
+            joblib.dump(model, model_filename, compress=("lz4", 3))
 
             logger.info(f"Model saved at {model_filename}")
         except Exception as e: